@@ -1,9 +1,23 @@
+import asyncio
+import html
+import os
 import re
-import time
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Optional
 
-from playwright.sync_api import Playwright, sync_playwright, TimeoutError as PlaywrightTimeoutError, expect
+import httpx
+import orjson
+from playwright.async_api import ElementHandle, Playwright, async_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError, expect
+from selectolax.parser import HTMLParser
+
+
+HH_API_URL = "https://api.hh.ru"
+# Формат, который требует API hh.ru: "AppName/version (contact)"; иначе 400 bad_user_agent
+HH_USER_AGENT = "custom-autoresponses-on-hh.ru/1.0 (https://github.com/OxY623/custom-autoresponses-on-hh.ru)"
+AUTH_STATE_PATH = "hh_auth.json"  # Снимок сессии; при восстановлении берутся только куки
+PROFILE_DIR = ".hh_profile"  # Профиль Chromium, переживающий перезапуски
+CDP_PORT = 9222  # Порт браузера, запущенного с --keep-alive
+KEEP_ALIVE_MARKER = ".hh_keep_alive.json"  # Порт и профиль работающего --keep-alive браузера
 
 
 # -------------------- МОДЕЛИ --------------------
@@ -17,69 +31,184 @@ class Vacancy:
     description: Optional[str] = None  # Текст вакансии
 
 
+_INT_RE = re.compile(r"(\d+)")
+_VAC_ID_RE = re.compile(r"/vacancy/(\d+)")
+
+
 def _parse_int(text: str) -> int | None:
     if not text:
         return None
     text = text.replace("\xa0", " ")
-    m = re.search(r"(\d+)", text)
+    m = _INT_RE.search(text)
     return int(m.group(1)) if m else None
 
 
+# -------------------- БРАУЗЕР: ЛИШНИЕ РЕСУРСЫ --------------------
+
+_BLOCKED_EXTENSIONS = ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico",
+                       "woff", "woff2", "ttf", "otf", "mp4", "webm", "mp3")
+_BLOCKED_HOSTS = ("google-analytics.com", "googletagmanager.com", "mc.yandex.ru", "doubleclick.net")
+_BLOCKED_URL_PATTERNS = (
+    [f"*.{ext}" for ext in _BLOCKED_EXTENSIONS]
+    + [f"*.{ext}?*" for ext in _BLOCKED_EXTENSIONS]
+    + [f"*{host}/*" for host in _BLOCKED_HOSTS]
+)
+
+
+async def block_heavy_resources(page) -> None:
+    """
+    Не грузим во вкладке картинки, шрифты, медиа и трекеры: скрипт их не читает.
+    Блокируем через CDP (Network.setBlockedURLs), а не context.route: с маршрутизацией каждый
+    запрос проходит через Python, а HTTP-кэш браузера отключается.
+    Стили оставляем — от них зависят видимость элементов и ленивая подгрузка выдачи.
+    """
+    cdp = await page.context.new_cdp_session(page)
+    await cdp.send("Network.enable")
+    await cdp.send("Network.setBlockedURLs", {"urls": _BLOCKED_URL_PATTERNS})
+
+
+# -------------------- БРАУЗЕР: ЗАПУСК --------------------
+
+async def open_browser_context(playwright: Playwright):
+    """
+    Если браузер запущен этим скриптом через --keep-alive (есть KEEP_ALIVE_MARKER для того же
+    профиля), подключается к нему по CDP. Любой другой браузер с открытым отладочным портом
+    не трогаем. Иначе запускает persistent-контекст с профилем PROFILE_DIR.
+    Возвращает (context, owns_context, cdp_browser): owns_context=False — контекст чужой,
+    закрывать его нельзя; cdp_browser — CDP-подключение, от которого нужно отключиться.
+    """
+    marker = None
+    if os.path.exists(KEEP_ALIVE_MARKER):
+        with open(KEEP_ALIVE_MARKER, "rb") as f:
+            marker = orjson.loads(f.read())
+
+    if marker and marker.get("profile") == os.path.abspath(PROFILE_DIR):
+        try:
+            browser = await playwright.chromium.connect_over_cdp(f"http://localhost:{marker['port']}", timeout=2000)
+        except PlaywrightError:
+            # браузер уже не работает — маркер остался от аварийного завершения
+            os.remove(KEEP_ALIVE_MARKER)
+        else:
+            print(f"🔌 Подключился к запущенному браузеру (порт {marker['port']})")
+            context = browser.contexts[0] if browser.contexts else await browser.new_context()
+            return context, False, browser
+
+    context = await playwright.chromium.launch_persistent_context(PROFILE_DIR, headless=False)
+    return context, True, None
+
+
+async def release_browser_context(context, page, owns_context: bool, cdp_browser=None) -> None:
+    """
+    Закрывает контекст, если run открыл его сам; в чужом контексте закрывает только свою вкладку
+    и отключается от CDP-браузера (сам браузер --keep-alive продолжает работать).
+    """
+    if owns_context:
+        await context.close()
+        return
+
+    await page.close()
+    if cdp_browser is not None:
+        await cdp_browser.close()
+
+
+async def keep_browser_alive(playwright: Playwright) -> None:
+    """
+    Держит запущенным браузер с профилем PROFILE_DIR и открытым CDP-портом,
+    чтобы следующие запуски скрипта подключались к нему без холодного старта.
+    Пока браузер работает, в KEEP_ALIVE_MARKER лежат его порт и профиль.
+    """
+    context = await playwright.chromium.launch_persistent_context(
+        PROFILE_DIR, headless=False, args=[f"--remote-debugging-port={CDP_PORT}"],
+    )
+    with open(KEEP_ALIVE_MARKER, "wb") as f:
+        f.write(orjson.dumps({"port": CDP_PORT, "profile": os.path.abspath(PROFILE_DIR)}))
+    print(f"🌐 Браузер запущен (порт {CDP_PORT}). Запускайте скрипт в другом терминале, Ctrl+C — остановить.")
+    try:
+        closed = asyncio.Event()
+        context.on("close", lambda _: closed.set())
+        await closed.wait()
+    finally:
+        if os.path.exists(KEEP_ALIVE_MARKER):
+            os.remove(KEEP_ALIVE_MARKER)
+
+
 # -------------------- SERP: ПРОГРУЗКА --------------------
 
-def scroll_until_all_loaded(page, pause_ms: int = 900, max_scrolls: int = 50, stable_rounds_needed: int = 3) -> None:
-    cards = page.locator('[data-qa="vacancy-serp__vacancy"]')
+_SERP_COUNTER_JS = """() => {
+  const count = () => document.querySelectorAll('[data-qa="vacancy-serp__vacancy"]').length;
+  window.__serpObserver?.disconnect();
+  window.__serpCount = count();
+  // Один пересчёт на пачку мутаций: инкрементальный подсчёт по addedNodes двоится,
+  // когда в одной пачке добавлены и обёртка, и карточка внутри неё
+  window.__serpObserver = new MutationObserver(() => { window.__serpCount = count(); });
+  window.__serpObserver.observe(document.body, {childList: true, subtree: true});
+  return window.__serpCount;
+}"""
+_SERP_COUNT_JS = "window.__serpCount"
+_SERP_COUNTER_STOP_JS = "() => { window.__serpObserver?.disconnect(); window.__serpObserver = null; }"
+
+
+async def scroll_until_all_loaded(page, pause_ms: int = 900, max_scrolls: int = 50, stable_rounds_needed: int = 3) -> None:
+    # Счётчик карточек ведёт MutationObserver в странице: на каждом шаге читаем глобальную переменную
     stable = 0
-    prev = cards.count()
+    prev = await page.evaluate(_SERP_COUNTER_JS)
 
     print(f"Начинаю прогрузку скроллом. Сейчас карточек: {prev}")
 
-    for i in range(1, max_scrolls + 1):
-        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        page.wait_for_timeout(pause_ms)
-        page.wait_for_timeout(int(pause_ms * 0.6))
-
-        cur = cards.count()
-        if cur > prev:
-            print(f"  Скролл {i}: +{cur - prev} (стало {cur})")
-            prev = cur
-            stable = 0
-        else:
-            stable += 1
-            print(f"  Скролл {i}: новых нет (стало {cur}), стабильность {stable}/{stable_rounds_needed}")
-            if stable >= stable_rounds_needed:
-                break
+    try:
+        for i in range(1, max_scrolls + 1):
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            # Ждём, пока подгрузятся новые карточки, а не фиксированную паузу
+            try:
+                await page.wait_for_function("prev => window.__serpCount > prev", arg=prev, timeout=pause_ms * 2)
+            except PlaywrightTimeoutError:
+                pass  # новых карточек нет — сработает ветка стабильности
+
+            cur = await page.evaluate(_SERP_COUNT_JS)
+            if cur > prev:
+                print(f"  Скролл {i}: +{cur - prev} (стало {cur})")
+                prev = cur
+                stable = 0
+            else:
+                stable += 1
+                print(f"  Скролл {i}: новых нет (стало {cur}), стабильность {stable}/{stable_rounds_needed}")
+                if stable >= stable_rounds_needed:
+                    break
+    finally:
+        # Наблюдатель нужен только на время прогрузки: модалки и снекбары при откликах его не касаются
+        await page.evaluate(_SERP_COUNTER_STOP_JS)
 
     print(f"Прогрузка завершена. Итого карточек: {prev}")
 
 
 # -------------------- SERP: ПАРСИНГ --------------------
 
-def collect_vacancies_for_apply(page, limit: int = 10) -> list[Vacancy]:
-    page.wait_for_selector('[data-qa="vacancy-serp__vacancy"]', timeout=30_000)
-    cards = page.locator('[data-qa="vacancy-serp__vacancy"]')
+_SERP_CARDS_JS = """() => [...document.querySelectorAll('[data-qa="vacancy-serp__vacancy"]')]
+  .filter(c => c.querySelector('[data-qa="vacancy-serp__vacancy_response"]'))
+  .map(c => ({
+    title: (c.querySelector('[data-qa="serp-item__title-text"]')?.innerText || '').trim(),
+    href: c.querySelector('a[data-qa="serp-item__title"]')?.getAttribute('href') || '',
+    watchers: ([...c.querySelectorAll('span')].find(s => s.innerText.includes('Сейчас смотрят'))?.innerText || '').trim(),
+  }))"""
 
-    result: list[Vacancy] = []
-    for i in range(cards.count()):
-        card = cards.nth(i)
 
-        # есть кнопка "Откликнуться" в карточке?
-        resp = card.locator('[data-qa="vacancy-serp__vacancy_response"]').first
-        if resp.count() == 0:
-            continue
+async def collect_vacancies_for_apply(page, limit: int = 10) -> list[Vacancy]:
+    await page.wait_for_selector('[data-qa="vacancy-serp__vacancy"]', timeout=30_000)
+
+    # Все карточки с кнопкой "Откликнуться" читаем одним evaluate, а не локаторами на каждое поле
+    cards = await page.evaluate(_SERP_CARDS_JS)
 
-        title = card.locator('[data-qa="serp-item__title-text"]').first.inner_text().strip()
-        href = card.locator('a[data-qa="serp-item__title"]').first.get_attribute("href") or ""
-        m = re.search(r"/vacancy/(\d+)", href)
+    result: list[Vacancy] = []
+    for card in cards:
+        m = _VAC_ID_RE.search(card["href"])
         if not m:
             continue
         vacancy_id = m.group(1)
 
-        watchers_loc = card.locator('span:has-text("Сейчас смотрят")').first
-        watchers_text = watchers_loc.inner_text().strip() if watchers_loc.count() else "Сейчас смотрят —"
+        watchers_text = card["watchers"] or "Сейчас смотрят —"
         watchers_count = _parse_int(watchers_text)
 
-        result.append(Vacancy(vacancy_id=vacancy_id, title=title, watchers_text=watchers_text, watchers_count=watchers_count))
+        result.append(Vacancy(vacancy_id=vacancy_id, title=card["title"], watchers_text=watchers_text, watchers_count=watchers_count))
         if len(result) >= limit:
             break
 
@@ -87,90 +216,274 @@ def collect_vacancies_for_apply(page, limit: int = 10) -> list[Vacancy]:
 
 
 def find_card_by_vacancy_id(page, vacancy_id: str):
+    # Один CSS-запрос с :has() вместо has=-локатора, перепроверяемого на каждой карточке
     return page.locator(
-        '[data-qa="vacancy-serp__vacancy"]',
-        has=page.locator(f'a[data-qa="serp-item__title"][href*="/vacancy/{vacancy_id}"]'),
+        f'[data-qa="vacancy-serp__vacancy"]:has(a[data-qa="serp-item__title"][href*="/vacancy/{vacancy_id}"])'
     ).first
 
 
+_SERP_CARDS_BY_ID_JS = """ids => {
+  const wanted = new Set(ids);
+  return Object.fromEntries(
+    [...document.querySelectorAll('[data-qa="vacancy-serp__vacancy"]')]
+      .map(c => [(c.querySelector('a[data-qa="serp-item__title"]')?.getAttribute('href') || '').match(/\\/vacancy\\/(\\d+)/)?.[1], c])
+      .filter(([id]) => wanted.has(id))
+  );
+}"""
+
+
+async def map_card_handles(page, vacancy_ids: list[str]) -> dict[str, ElementHandle]:
+    """
+    За один проход по выдаче сопоставляет vacancy_id → ElementHandle карточки,
+    чтобы не искать карточку заново перед откликом и скрытием.
+    Хэндлы создаются только для переданных vacancy_ids, а не для всей прогруженной выдачи.
+    """
+    by_id = await page.evaluate_handle(_SERP_CARDS_BY_ID_JS, vacancy_ids)
+    props = await by_id.get_properties()
+    await by_id.dispose()
+
+    handles: dict[str, ElementHandle] = {}
+    for vacancy_id, h in props.items():
+        element = h.as_element()
+        if element is None:
+            await h.dispose()
+        else:
+            handles[vacancy_id] = element
+    return handles
+
+
+async def dispose_card_handles(handles: dict[str, ElementHandle]) -> None:
+    for card in handles.values():
+        try:
+            await card.dispose()
+        except PlaywrightError:
+            pass  # контекст исполнения уже уничтожен вместе с хэндлом
+    handles.clear()
+
+
+async def resolve_card(page, handles: dict[str, ElementHandle], vacancy_id: str) -> Optional[ElementHandle]:
+    """
+    Возвращает закэшированную карточку, если она ещё в DOM. Иначе (выдача перезагрузилась
+    после редиректа) ищет её заново и обновляет кэш. None — карточки на странице нет.
+    """
+    card = handles.get(vacancy_id)
+    if card is not None:
+        try:
+            if await card.evaluate("el => el.isConnected"):
+                return card
+            await card.dispose()
+        except PlaywrightError:
+            pass
+
+    locator = find_card_by_vacancy_id(page, vacancy_id)
+    if await locator.count() == 0:
+        handles.pop(vacancy_id, None)
+        return None
+    card = handles[vacancy_id] = await locator.element_handle()
+    return card
+
+
 # -------------------- ТЕСТ/ВОПРОСЫ (РЕДИРЕКТ) --------------------
 
-def is_test_page(page) -> bool:
+async def is_test_page(page) -> bool:
     """
     Детект "вопросов работодателя":
       - data-qa="title-container"
       - data-qa="title-description" содержит "Для отклика необходимо ответить..."
     """
     container = page.locator('[data-qa="title-container"]').first
-    if container.count() == 0:
+    if await container.count() == 0:
         return False
 
     desc = page.locator('[data-qa="title-description"]:has-text("Для отклика необходимо ответить")').first
-    return desc.count() > 0
+    return await desc.count() > 0
 
 
-def safe_go_back_to_serp(page, fallback_url: str) -> None:
+async def safe_go_back_to_serp(page, fallback_url: str) -> None:
     """
+    Сначала go_back: Chromium поднимает выдачу из BFCache без перерендера.
+    Если за 5 секунд выдача не вернулась — полная навигация на fallback_url.
     ВАЖНО: networkidle на HH часто не наступает, поэтому ждём выдачу селектором.
     """
     try:
-        page.go_back(wait_until="domcontentloaded")
+        await page.go_back(wait_until="domcontentloaded", timeout=5000)
+        await page.wait_for_selector('[data-qa="vacancy-serp__vacancy"]', timeout=5000)
+        return
     except Exception:
-        page.goto(fallback_url, wait_until="domcontentloaded")
+        pass
 
+    await page.goto(fallback_url, wait_until="domcontentloaded")
     # ждём возвращение выдачи
-    page.wait_for_selector('[data-qa="vacancy-serp__vacancy"]', timeout=15_000)
+    await page.wait_for_selector('[data-qa="vacancy-serp__vacancy"]', timeout=15_000)
 
 
 # -------------------- ИЗВЛЕЧЕНИЕ ТЕКСТА ВАКАНСИИ --------------------
 
-def extract_vacancy_text(page, vacancy_id: str) -> Optional[str]:
+async def extract_vacancy_text(page, vacancy_id: str) -> Optional[str]:
     """
-    Открывает страницу вакансии и извлекает её описание.
+    Открывает страницу вакансии в переданной вкладке и извлекает её описание.
+    Вкладка должна быть отдельной от выдачи: обратно на SERP она не возвращается.
     Возвращает текст вакансии или None при ошибке.
     """
-    original_url = page.url
-    
     try:
         vacancy_url = f"https://hh.ru/vacancy/{vacancy_id}"
-        page.goto(vacancy_url, wait_until="domcontentloaded", timeout=15_000)
+        await page.goto(vacancy_url, wait_until="domcontentloaded", timeout=15_000)
         
         # Ждём загрузки описания вакансии
         description_selector = '[data-qa="vacancy-description"]'
-        page.wait_for_selector(description_selector, timeout=10_000)
+        await page.wait_for_selector(description_selector, timeout=10_000)
         
         # Извлекаем текст описания
         description = page.locator(description_selector).first
-        if description.count() > 0:
-            text = description.inner_text().strip()
+        if await description.count() > 0:
+            text = (await description.inner_text()).strip()
             return text
         
         return None
     except Exception as e:
         print(f"    ⚠️ Ошибка при извлечении текста вакансии: {e}")
         return None
-    finally:
-        # Возвращаемся обратно на страницу поиска
+
+
+_HTML_BREAK_RE = re.compile(r"<br\s*/?>|</(?:p|li|h\d|div)>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+def _html_to_text(raw_html: str) -> str:
+    text = _HTML_BREAK_RE.sub("\n", raw_html)
+    text = html.unescape(_HTML_TAG_RE.sub("", text))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+_HTTP_LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=10)
+
+
+async def make_http_client(context) -> httpx.AsyncClient:
+    """
+    HTTP-клиент для API hh.ru с куками залогиненного браузерного контекста.
+    Один клиент на весь запуск: HTTP/2 мультиплексирует запросы в одном TLS-соединении.
+    """
+    cookies = httpx.Cookies()
+    for c in await context.cookies():
+        cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"])
+    return httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS, cookies=cookies,
+                             headers={"HH-User-Agent": HH_USER_AGENT}, timeout=10.0, follow_redirects=True)
+
+
+async def fetch_vacancy_description_api(client: httpx.AsyncClient, vacancy_id: str) -> Optional[str]:
+    """
+    Берёт описание вакансии из JSON API hh.ru (/vacancies/{id}) без рендера страницы.
+    Возвращает текст вакансии или None, если API ничего не отдал.
+    """
+    try:
+        r = await client.get(f"{HH_API_URL}/vacancies/{vacancy_id}")
+        if r.status_code != 200:
+            print(f"    ⚠️ API hh.ru вернул {r.status_code} для вакансии {vacancy_id}")
+            return None
+        description = orjson.loads(r.content).get("description")
+        return _html_to_text(description) if description else None
+    except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+        print(f"    ⚠️ API hh.ru не отдал вакансию {vacancy_id}: {e}")
+        return None
+
+
+async def fetch_vacancy_description_html(client: httpx.AsyncClient, vacancy_id: str) -> Optional[str]:
+    """
+    Загружает HTML страницы вакансии с куками сессии и достаёт описание через selectolax,
+    не запуская браузер. Возвращает None, если описания в серверном HTML нет.
+    """
+    try:
+        r = await client.get(f"https://hh.ru/vacancy/{vacancy_id}")
+        if r.status_code != 200:
+            print(f"    ⚠️ Страница вакансии {vacancy_id} вернула {r.status_code}")
+            return None
+    except httpx.HTTPError as e:
+        print(f"    ⚠️ Не удалось загрузить страницу вакансии {vacancy_id}: {e}")
+        return None
+
+    node = HTMLParser(r.text).css_first('[data-qa="vacancy-description"]')
+    return (_html_to_text(node.html) or None) if node else None
+
+
+async def fetch_vacancy_descriptions(context, client: httpx.AsyncClient, vacancies: list[Vacancy], *,
+                                     max_concurrency: int = 5, stagger_ms: int = 100) -> list[Vacancy]:
+    """
+    Извлекает тексты вакансий: сначала параллельно по HTTP (API hh.ru, затем HTML страницы
+    вакансии), а то, что так получить не удалось, — пулом из max_concurrency вкладок,
+    которые разбирают общую очередь вакансий.
+    Старты HTTP-запросов и вкладок разнесены на stagger_ms, чтобы не упираться в ограничения
+    hh.ru по частоте запросов.
+    Порядок вакансий сохраняется.
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def from_http(idx: int, v: Vacancy) -> tuple[str, Optional[str]]:
+        await asyncio.sleep(idx * stagger_ms / 1000)
+        async with sem:
+            description = (await fetch_vacancy_description_api(client, v.vacancy_id)
+                           or await fetch_vacancy_description_html(client, v.vacancy_id))
+            return v.vacancy_id, description
+
+    descriptions = dict(await asyncio.gather(*(from_http(idx, v) for idx, v in enumerate(vacancies))))
+
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for vacancy_id, description in descriptions.items():
+        if description is None:
+            queue.put_nowait(vacancy_id)
+
+    async def worker(idx: int) -> None:
+        await asyncio.sleep(idx * stagger_ms / 1000)
+        if queue.empty():
+            return
+        page = await context.new_page()
         try:
-            page.goto(original_url, wait_until="domcontentloaded", timeout=10_000)
-            page.wait_for_selector('[data-qa="vacancy-serp__vacancy"]', timeout=10_000)
-        except Exception:
-            pass
+            await block_heavy_resources(page)
+            while True:
+                try:
+                    vacancy_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                descriptions[vacancy_id] = await extract_vacancy_text(page, vacancy_id)
+        finally:
+            await page.close()
+
+    await asyncio.gather(*(worker(idx) for idx in range(min(max_concurrency, queue.qsize()))))
+    return [replace(v, description=descriptions[v.vacancy_id]) for v in vacancies]
 
 
 # -------------------- МОДАЛКА: ОБЯЗАТЕЛЬНОЕ СОПРОВОДИТЕЛЬНОЕ --------------------
 
-def is_cover_letter_required_modal(page) -> bool:
-    dlg = page.locator('[role="dialog"]').first
-    if dlg.count() == 0:
-        return False
+RESPONSE_SENT = 1
+COVER_LETTER_REQUIRED = 2
 
-    required_hint = dlg.locator('[data-qa="form-helper-description"]:has-text("Сопроводительное письмо обязательное")').first
-    letter_input = dlg.locator('[data-qa="vacancy-response-popup-form-letter-input"]').first
-    return required_hint.count() > 0 and letter_input.count() > 0
+_RESPONSE_STATE_JS = """([SENT, LETTER_REQUIRED]) => {
+  const snack = document.querySelector('#dialog-description');
+  const dlg = document.querySelector('[role="dialog"]');
+  const hint = dlg?.querySelector('[data-qa="form-helper-description"]');
+  const letter = dlg?.querySelector('[data-qa="vacancy-response-popup-form-letter-input"]');
+  return (snack?.textContent.includes('Отклик отправлен') ? SENT : 0)
+       | (hint?.textContent.includes('Сопроводительное письмо обязательное') && letter ? LETTER_REQUIRED : 0);
+}"""
 
 
-def fill_and_submit_cover_letter(page, cover_letter_text: str, timeout_ms: int = 10_000) -> bool:
+async def get_response_state(page) -> int:
+    """
+    Одним evaluate читает состояние после клика "Откликнуться".
+    Возвращает битовую маску из RESPONSE_SENT и COVER_LETTER_REQUIRED (0 — ни того, ни другого).
+    """
+    try:
+        return await page.evaluate(_RESPONSE_STATE_JS, [RESPONSE_SENT, COVER_LETTER_REQUIRED])
+    except PlaywrightError:
+        # страница как раз уходит в редирект — контекст исполнения уничтожен
+        return 0
+
+
+_RESPONSE_DONE_JS = """() => document.querySelector('#dialog-description')?.textContent.includes('Отклик отправлен')
+  || ![...document.querySelectorAll('[role="dialog"]')].some(d => d.getClientRects().length)"""
+
+
+async def fill_and_submit_cover_letter(page, cover_letter_text: str, timeout_ms: int = 10_000) -> bool:
     """
     Заполняет сопроводительное письмо в модалке и отправляет отклик.
     Возвращает True если отклик успешно отправлен.
@@ -178,96 +491,86 @@ def fill_and_submit_cover_letter(page, cover_letter_text: str, timeout_ms: int =
     try:
         # Ждём появления модалки
         dlg = page.locator('[role="dialog"]').first
-        dlg.wait_for(state="visible", timeout=timeout_ms)
+        await dlg.wait_for(state="visible", timeout=timeout_ms)
         
         # Находим поле для сопроводительного письма
         letter_input = dlg.locator('[data-qa="vacancy-response-popup-form-letter-input"]').first
-        letter_input.wait_for(state="visible", timeout=timeout_ms)
+        await letter_input.wait_for(state="visible", timeout=timeout_ms)
         
         # Очищаем поле и заполняем
-        letter_input.click()
-        letter_input.fill(cover_letter_text)
-        page.wait_for_timeout(500)  # Небольшая задержка для обновления UI
+        await letter_input.click()
+        await letter_input.fill(cover_letter_text)
         
         # Ищем кнопку отправки
         submit_btn = dlg.locator('button[type="submit"]').first
-        if submit_btn.count() == 0:
+        if await submit_btn.count() == 0:
             # Альтернативные селекторы
             submit_btn = dlg.locator('button:has-text("Откликнуться")').first
-        if submit_btn.count() == 0:
+        if await submit_btn.count() == 0:
             submit_btn = dlg.locator('[data-qa="vacancy-response-popup-submit-button"]').first
-        if submit_btn.count() == 0:
+        if await submit_btn.count() == 0:
             submit_btn = page.locator('button:has-text("Откликнуться")').first
         
-        if submit_btn.count() == 0:
+        if await submit_btn.count() == 0:
             print("    ⚠️ Кнопка отправки не найдена")
             return False
         
         # Проверяем, что кнопка видима и кликабельна
-        submit_btn.wait_for(state="visible", timeout=3000)
+        await submit_btn.wait_for(state="visible", timeout=3000)
         
         # Отправляем отклик
-        submit_btn.click()
-        
-        # Ждём подтверждения отправки
-        page.wait_for_timeout(2000)
-        
-        # Проверяем успешную отправку
-        success_indicator = page.locator('#dialog-description:has-text("Отклик отправлен")').first
-        if success_indicator.count() > 0:
-            return True
+        await submit_btn.click()
         
-        # Альтернативная проверка - модалка должна закрыться
+        # Ждём подтверждения отправки: снекбар "Отклик отправлен" или закрытие модалки
         try:
-            dlg.wait_for(state="hidden", timeout=3000)
+            await page.wait_for_function(_RESPONSE_DONE_JS, timeout=5000)
             return True
-        except Exception:
-            pass
-        
-        return False
+        except PlaywrightTimeoutError:
+            return False
     except Exception as e:
         print(f"    ⚠️ Ошибка при заполнении сопроводительного письма: {e}")
         return False
 
 
-def close_response_modal_if_open(page) -> None:
+async def close_response_modal_if_open(page) -> None:
     close_btn = page.locator('[data-qa="response-popup-close"]').first
-    if close_btn.count():
-        close_btn.click()
+    if await close_btn.count():
+        await close_btn.click()
         try:
-            page.locator('[role="dialog"]').first.wait_for(state="hidden", timeout=5000)
+            await page.locator('[role="dialog"]').first.wait_for(state="hidden", timeout=5000)
         except Exception:
             pass
 
 
 # -------------------- СКРЫТИЕ ВАКАНСИИ --------------------
 
-def hide_vacancy_card(page, card, *, timeout_ms: int = 5000) -> bool:
+async def hide_vacancy_card(page, card, *, timeout_ms: int = 5000) -> bool:
     """
+    card — ElementHandle карточки (см. resolve_card).
     1) В карточке: button[data-qa="vacancy__blacklist-show-add"]
     2) В меню:    button[data-qa="vacancy__blacklist-menu-add-vacancy"]
     """
-    hide_icon = card.locator('button[data-qa="vacancy__blacklist-show-add"]').first
-    if hide_icon.count() == 0:
+    hide_icon = await card.query_selector('button[data-qa="vacancy__blacklist-show-add"]')
+    if hide_icon is None:
         return False
 
-    card.scroll_into_view_if_needed(timeout=timeout_ms)
+    await card.scroll_into_view_if_needed(timeout=timeout_ms)
 
     try:
-        hide_icon.click(timeout=timeout_ms)
+        await hide_icon.click(timeout=timeout_ms)
     except Exception:
         return False
 
     menu_item = page.locator('button[data-qa="vacancy__blacklist-menu-add-vacancy"]').first
     try:
-        menu_item.wait_for(state="visible", timeout=timeout_ms)
-        menu_item.click(timeout=timeout_ms)
+        await menu_item.wait_for(state="visible", timeout=timeout_ms)
+        await menu_item.click(timeout=timeout_ms)
     except Exception:
         return False
 
     # иногда карточка реально удаляется из DOM
     try:
-        card.wait_for(state="detached", timeout=3000)
+        await page.wait_for_function("el => !el.isConnected", arg=card, timeout=3000)
     except Exception:
         pass
 
@@ -276,10 +579,56 @@ def hide_vacancy_card(page, card, *, timeout_ms: int = 5000) -> bool:
 
 # -------------------- ОТКЛИК "В ОДИН КЛИК" --------------------
 
-def click_apply_on_card(page, card, cover_letter_text: Optional[str] = None, *, poll_timeout_sec: float = 6.0) -> str:
+_SENT_SNACK_SELECTOR = '#dialog-description:has-text("Отклик отправлен")'
+_LETTER_INPUT_SELECTOR = '[role="dialog"] [data-qa="vacancy-response-popup-form-letter-input"]'
+
+
+async def _apply_outcome(page, original_url: str, cover_letter_text: Optional[str]) -> Optional[str]:
+    """
+    Разбирает, чем закончился клик "Откликнуться". None — пока ничего определённого.
+    """
+    state = await get_response_state(page)
+
+    # 1) snackbar успеха
+    if state & RESPONSE_SENT:
+        return "sent"
+
+    # 2) модалка с обязательным сопроводительным
+    if state & COVER_LETTER_REQUIRED:
+        if cover_letter_text:
+            # Пытаемся заполнить и отправить
+            if await fill_and_submit_cover_letter(page, cover_letter_text):
+                # Проверяем успешную отправку
+                try:
+                    await page.locator(_SENT_SNACK_SELECTOR).first.wait_for(timeout=1000)
+                    return "sent"
+                except PlaywrightTimeoutError:
+                    return "cover_letter_filled"
+            else:
+                await close_response_modal_if_open(page)
+                return "cover_letter_required"
+        else:
+            await close_response_modal_if_open(page)
+            return "cover_letter_required"
+
+    # 3) редирект на доп.страницу (вопросы/тест)
+    if page.url != original_url:
+        if await is_test_page(page):
+            await safe_go_back_to_serp(page, fallback_url=original_url)
+            return "test_required"
+
+        await safe_go_back_to_serp(page, fallback_url=original_url)
+        return "extra_steps"
+
+    return None
+
+
+async def click_apply_on_card(page, card, cover_letter_text: Optional[str] = None, *, timeout_sec: float = 6.0) -> str:
     """
     Отправляет отклик на вакансию. Если требуется сопроводительное письмо и оно предоставлено,
-    заполняет и отправляет его.
+    заполняет и отправляет его. card — ElementHandle карточки (см. resolve_card).
+    Вместо опроса по таймеру ждём первое из событий: снекбар успеха, поле письма в модалке
+    или смена URL.
     
     Возвращаем:
       - sent - отклик успешно отправлен
@@ -290,151 +639,150 @@ def click_apply_on_card(page, card, cover_letter_text: Optional[str] = None, *,
       - unknown - неизвестный статус
     """
     original_url = page.url
-    card.scroll_into_view_if_needed(timeout=10_000)
+    await card.scroll_into_view_if_needed(timeout=10_000)
 
-    apply_btn = card.locator('[data-qa="vacancy-serp__vacancy_response"]').first
-    if apply_btn.count() == 0:
+    apply_btn = await card.query_selector('[data-qa="vacancy-serp__vacancy_response"]')
+    if apply_btn is None:
         return "no_apply_button"
 
-    apply_btn.click()
-
-    deadline = time.time() + poll_timeout_sec
-    while time.time() < deadline:
-        # 1) snackbar успеха
-        if page.locator('#dialog-description:has-text("Отклик отправлен")').count():
-            return "sent"
-
-        # 2) модалка с обязательным сопроводительным
-        if is_cover_letter_required_modal(page):
-            if cover_letter_text:
-                # Пытаемся заполнить и отправить
-                if fill_and_submit_cover_letter(page, cover_letter_text):
-                    # Проверяем успешную отправку
-                    page.wait_for_timeout(1000)
-                    if page.locator('#dialog-description:has-text("Отклик отправлен")').count():
-                        return "sent"
-                    return "cover_letter_filled"
-                else:
-                    close_response_modal_if_open(page)
-                    return "cover_letter_required"
-            else:
-                close_response_modal_if_open(page)
-                return "cover_letter_required"
+    await apply_btn.click()
 
-        # 3) редирект на доп.страницу (вопросы/тест)
-        if page.url != original_url:
-            if is_test_page(page):
-                safe_go_back_to_serp(page, fallback_url=original_url)
-                return "test_required"
+    timeout_ms = timeout_sec * 1000
+    pending = {
+        asyncio.create_task(page.wait_for_selector(_SENT_SNACK_SELECTOR, timeout=timeout_ms)),
+        asyncio.create_task(page.wait_for_selector(_LETTER_INPUT_SELECTOR, timeout=timeout_ms)),
+        asyncio.create_task(page.wait_for_url(lambda url: url != original_url, wait_until="commit", timeout=timeout_ms)),
+    }
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if all(t.exception() is not None for t in done):
+                # истёк таймаут этого ожидания — ждём оставшиеся
+                continue
+
+            status = await _apply_outcome(page, original_url, cover_letter_text)
+            if status is not None:
+                return status
+            # исход пока неясен (например, модалка с необязательным письмом) — ждём оставшиеся
+    finally:
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
-            safe_go_back_to_serp(page, fallback_url=original_url)
-            return "extra_steps"
+    # последняя проверка: редирект или подсказка модалки могли дорисоваться после ожиданий
+    return await _apply_outcome(page, original_url, cover_letter_text) or "unknown"
 
-        page.wait_for_timeout(200)
 
-    return "unknown"
+# -------------------- ЛОГИН --------------------
 
+async def is_logged_in(page) -> bool:
+    """
+    Проверяет, жива ли сессия: без входа hh.ru редиректит с резюме на страницу логина.
+    """
+    try:
+        await page.goto("https://hh.ru/applicant/resumes", wait_until="domcontentloaded")
+    except Exception:
+        return False
+    return "account/login" not in page.url
 
-# -------------------- ЛОГИН --------------------
 
-def login_with_phone(page, phone_number: str, sms_code: Optional[str] = None) -> bool:
+async def login_with_phone(page, phone_number: str, sms_code: Optional[str] = None) -> bool:
     """
     Выполняет вход на hh.ru через телефон и SMS.
     Если sms_code не предоставлен, ждёт ввода от пользователя.
     Возвращает True при успешном входе.
     """
     try:
-        page.goto("https://hh.ru/", wait_until="domcontentloaded")
+        await page.goto("https://hh.ru/", wait_until="domcontentloaded")
         
         # Кликаем "Войти"
-        login_link = page.get_by_role("link", name="Войти").first
-        if login_link.count() == 0:
+        login_link = page.locator('[data-qa="login"], a[href*="account/login"]').first
+        if await login_link.count() == 0:
             # Возможно, уже залогинены
-            if page.locator('[data-qa="mainmenu_applicantProfile"]').count() > 0:
+            if await page.locator('[data-qa="mainmenu_applicantProfile"]').count() > 0:
                 print("✅ Уже выполнен вход")
                 return True
             return False
         
-        login_link.click()
-        page.wait_for_timeout(1000)
+        await login_link.click()
         
-        # Кликаем кнопку "Войти" в модалке
-        login_btn = page.get_by_role("button", name="Войти").first
-        if login_btn.count() > 0:
-            login_btn.click()
-            page.wait_for_timeout(1000)
+        # Кликаем кнопку "Войти" в модалке (ждём, пока отрисуется она или сразу поле телефона)
+        login_btn = page.locator('button:has-text("Войти")').first
+        phone_input = page.locator('input[type="tel"]').first
+        try:
+            await login_btn.or_(phone_input).first.wait_for(state="visible", timeout=10_000)
+        except PlaywrightTimeoutError:
+            pass
+        if await login_btn.count() > 0 and await phone_input.count() == 0:
+            await login_btn.click()
         
         # Вводим номер телефона
-        phone_input = page.locator('input[type="tel"]').first
-        if phone_input.count() == 0:
-            phone_input = page.get_by_role("textbox").nth(1)
+        try:
+            await phone_input.wait_for(state="visible", timeout=5000)
+        except PlaywrightTimeoutError:
+            phone_input = page.locator('input[type="text"]').nth(1)
         
-        if phone_input.count() == 0:
+        if await phone_input.count() == 0:
             print("⚠️ Поле ввода телефона не найдено")
             return False
         
-        phone_input.click()
-        phone_input.fill(phone_number)
-        page.wait_for_timeout(500)
+        await phone_input.click()
+        await phone_input.fill(phone_number)
         
         # Нажимаем "Дальше"
-        next_btn = page.get_by_role("button", name="Дальше").first
-        if next_btn.count() == 0:
-            next_btn = page.locator('button:has-text("Дальше")').first
-        
-        if next_btn.count() == 0:
+        next_btn = page.locator('button[data-qa="account-signup-submit"], button:has-text("Дальше")').first
+        if await next_btn.count() == 0:
             print("⚠️ Кнопка 'Дальше' не найдена")
             return False
         
-        next_btn.click()
-        page.wait_for_timeout(2000)
+        await next_btn.click()
         
         # Вводим код из SMS
         if not sms_code:
             sms_code = input("Введите код из SMS: ")
         
-        code_input = page.get_by_role("textbox", name="Введите код").first
-        if code_input.count() == 0:
+        code_input = page.locator('input[autocomplete="one-time-code"], input[placeholder*="код" i]').first
+        try:
+            await code_input.wait_for(state="visible", timeout=10_000)
+        except PlaywrightTimeoutError:
             code_input = page.locator('input[type="text"]').first
         
-        if code_input.count() == 0:
+        if await code_input.count() == 0:
             print("⚠️ Поле ввода кода не найдено")
             return False
         
-        code_input.click()
-        code_input.fill(sms_code)
-        page.wait_for_timeout(1000)
+        await code_input.click()
+        await code_input.fill(sms_code)
         
         # Пытаемся найти и нажать кнопку подтверждения (если есть)
         submit_code_btn = page.locator('button:has-text("Подтвердить")').first
-        if submit_code_btn.count() == 0:
+        if await submit_code_btn.count() == 0:
             submit_code_btn = page.locator('button[type="submit"]').first
-        if submit_code_btn.count() == 0:
+        if await submit_code_btn.count() == 0:
             # Пробуем Enter
-            code_input.press("Enter")
+            await code_input.press("Enter")
         else:
-            submit_code_btn.click()
+            await submit_code_btn.click()
         
-        # Ждём завершения входа (либо успех, либо ошибка)
-        page.wait_for_timeout(3000)
+        # Ждём завершения входа (либо меню профиля, либо видимая ошибка —
+        # скрытые узлы и шаблоны с текстом "ошибка" на странице есть и до ответа сервера)
+        profile_menu = page.locator('[data-qa="mainmenu_applicantProfile"]').first
+        error_msg = page.locator('text=/неверный код|ошибка/i >> visible=true').first
+        try:
+            await profile_menu.or_(error_msg).first.wait_for(state="attached", timeout=10_000)
+        except PlaywrightTimeoutError:
+            pass
         
-        # Проверяем успешный вход
-        if page.locator('[data-qa="mainmenu_applicantProfile"]').count() > 0:
+        # Проверяем успешный вход (ещё немного ждём меню: редирект мог не успеть завершиться)
+        try:
+            await profile_menu.wait_for(state="attached", timeout=2000)
             print("✅ Вход выполнен успешно")
             return True
+        except PlaywrightTimeoutError:
+            pass
         
-        # Проверяем ошибку (неверный код)
-        error_msg = page.locator('text=/неверный код|ошибка/i').first
-        if error_msg.count() > 0:
+        if await error_msg.count() > 0:
             print("⚠️ Неверный код из SMS")
-            return False
-        
-        # Дополнительная проверка через URL или другие индикаторы
-        page.wait_for_timeout(2000)
-        if page.locator('[data-qa="mainmenu_applicantProfile"]').count() > 0:
-            print("✅ Вход выполнен успешно")
-            return True
-        
         return False
     except Exception as e:
         print(f"⚠️ Ошибка при входе: {e}")
@@ -443,40 +791,34 @@ def login_with_phone(page, phone_number: str, sms_code: Optional[str] = None) ->
 
 # -------------------- ПОИСК --------------------
 
-def search_vacancies(page, search_query: str) -> bool:
+async def search_vacancies(page, search_query: str) -> bool:
     """
     Выполняет поиск вакансий по запросу.
     """
     try:
-        page.goto("https://hh.ru/", wait_until="domcontentloaded")
-        page.wait_for_timeout(1000)
+        await page.goto("https://hh.ru/", wait_until="domcontentloaded")
         
         # Находим поле поиска
-        search_input = page.get_by_role("textbox", name="Профессия, должность или компания").first
-        if search_input.count() == 0:
-            search_input = page.locator('input[data-qa="search-input"]').first
-        
-        if search_input.count() == 0:
+        search_input = page.locator('input[data-qa="search-input"]').first
+        try:
+            await search_input.wait_for(state="visible", timeout=10_000)
+        except PlaywrightTimeoutError:
             print("⚠️ Поле поиска не найдено")
             return False
         
-        search_input.click()
-        search_input.fill(search_query)
-        page.wait_for_timeout(500)
+        await search_input.click()
+        await search_input.fill(search_query)
         
         # Нажимаем кнопку поиска
-        search_btn = page.get_by_role("button", name="Найти").first
-        if search_btn.count() == 0:
-            search_btn = page.locator('button[data-qa="search-button"]').first
-        
-        if search_btn.count() == 0:
+        search_btn = page.locator('button[data-qa="search-button"]').first
+        if await search_btn.count() == 0:
             # Пробуем Enter
-            search_input.press("Enter")
+            await search_input.press("Enter")
         else:
-            search_btn.click()
+            await search_btn.click()
         
         # Ждём загрузки результатов
-        expect(page.locator('[data-qa="vacancy-serp__vacancy"]').first).to_be_visible(timeout=30_000)
+        await expect(page.locator('[data-qa="vacancy-serp__vacancy"]').first).to_be_visible(timeout=30_000)
         print(f"✅ Поиск выполнен: найдены вакансии")
         return True
     except Exception as e:
@@ -486,35 +828,29 @@ def search_vacancies(page, search_query: str) -> bool:
 
 # -------------------- ГЕНЕРАЦИЯ СОПРОВОДИТЕЛЬНОГО ПИСЬМА --------------------
 
-def generate_cover_letter(vacancy_title: str, vacancy_description: Optional[str] = None, 
-                         custom_template: Optional[str] = None) -> str:
-    """
-    Генерирует сопроводительное письмо на основе вакансии.
-    """
-    if custom_template:
-        return custom_template
-    
-    # Базовый шаблон
-    template = f"""Здравствуйте!
-
-Меня заинтересовала вакансия "{vacancy_title}".
+_COVER_LETTER_HEAD = "Здравствуйте!\n\nМеня заинтересовала вакансия \""
+_COVER_LETTER_TAIL = "\".\n\nГотов обсудить детали и ответить на ваши вопросы.\n\nС уважением"
 
-Готов обсудить детали и ответить на ваши вопросы.
 
-С уважением"""
-    
-    return template
+def generate_cover_letter(vacancy_title: str) -> str:
+    """
+    Генерирует базовое сопроводительное письмо по названию вакансии.
+    Пользовательский шаблон сюда не передаётся: run подставляет его как есть.
+    """
+    return "".join((_COVER_LETTER_HEAD, vacancy_title, _COVER_LETTER_TAIL))
 
 
 # -------------------- MAIN --------------------
 
-def run(playwright: Playwright, 
+async def run(playwright: Playwright, 
         phone_number: Optional[str] = None,
         sms_code: Optional[str] = None,
         search_query: Optional[str] = None,
         cover_letter_template: Optional[str] = None,
         extract_vacancy_texts: bool = False,
-        limit: int = 10) -> None:
+        limit: int = 10,
+        max_concurrency: int = 5,
+        context=None) -> None:
     """
     Основная функция запуска скрипта.
     
@@ -525,53 +861,61 @@ def run(playwright: Playwright,
         cover_letter_template: Шаблон сопроводительного письма
         extract_vacancy_texts: Извлекать ли текст вакансий
         limit: Максимальное количество вакансий для отклика
+        max_concurrency: Сколько вкладок одновременно используется для извлечения текстов
+        context: Готовый BrowserContext (если None, будет открыт, см. open_browser_context)
     """
-    browser = playwright.chromium.launch(headless=False)
-    context = browser.new_context()
-    page = context.new_page()
-
-    # Логин
-    if not phone_number:
-        phone_number = input("Введите номер телефона (например, +79991234567): ")
-    
-    if not login_with_phone(page, phone_number, sms_code):
-        print("❌ Не удалось выполнить вход")
-        context.close()
-        browser.close()
-        return
+    cdp_browser = None
+    if context is None:
+        context, owns_context, cdp_browser = await open_browser_context(playwright)
+    else:
+        owns_context = False
+
+    page = await context.new_page()
+    await block_heavy_resources(page)
+
+    # Логин: сначала сессия самого профиля. Куки из AUTH_STATE_PATH подкладываем, только если
+    # её нет, — иначе старые куки затёрли бы свежие, которые hh.ru уже ротировал в профиле.
+    logged_in = await is_logged_in(page)
+    if not logged_in and os.path.exists(AUTH_STATE_PATH):
+        with open(AUTH_STATE_PATH, "rb") as f:
+            await context.add_cookies(orjson.loads(f.read())["cookies"])
+        logged_in = await is_logged_in(page)
+
+    if logged_in:
+        print("✅ Сессия восстановлена")
+        await context.storage_state(path=AUTH_STATE_PATH)
+    else:
+        if not phone_number:
+            phone_number = input("Введите номер телефона (например, +79991234567): ")
+
+        if not await login_with_phone(page, phone_number, sms_code):
+            print("❌ Не удалось выполнить вход")
+            await release_browser_context(context, page, owns_context, cdp_browser)
+            return
+
+        await context.storage_state(path=AUTH_STATE_PATH)
 
     # Поиск
     if not search_query:
         search_query = input("Введите поисковый запрос (например, React Next.js разработчик): ")
     
-    if not search_vacancies(page, search_query):
+    if not await search_vacancies(page, search_query):
         print("❌ Не удалось выполнить поиск")
-        context.close()
-        browser.close()
+        await release_browser_context(context, page, owns_context, cdp_browser)
         return
 
     # Полная прогрузка
-    scroll_until_all_loaded(page)
+    await scroll_until_all_loaded(page)
 
     # Сбор вакансий
-    vacancies = collect_vacancies_for_apply(page, limit=limit)
+    vacancies = await collect_vacancies_for_apply(page, limit=limit)
     print(f"\n📋 Найдено вакансий для отклика: {len(vacancies)}")
     
     # Извлечение текстов вакансий (если нужно)
     if extract_vacancy_texts:
         print("\n📄 Извлекаю тексты вакансий...")
-        updated_vacancies = []
-        for v in vacancies:
-            description = extract_vacancy_text(page, v.vacancy_id)
-            updated_vac = Vacancy(
-                vacancy_id=v.vacancy_id,
-                title=v.title,
-                watchers_text=v.watchers_text,
-                watchers_count=v.watchers_count,
-                description=description
-            )
-            updated_vacancies.append(updated_vac)
-        vacancies = updated_vacancies
+        async with await make_http_client(context) as client:
+            vacancies = await fetch_vacancy_descriptions(context, client, vacancies, max_concurrency=max_concurrency)
 
     # План откликов
     print("\n📝 План отклика (только вакансии с кнопкой «Откликнуться»):")
@@ -580,20 +924,21 @@ def run(playwright: Playwright,
         print(f"{idx:02d}. {v.title} | сейчас смотрят: {w} | vacancy_id={v.vacancy_id}")
 
     # Отклики
+    card_handles = await map_card_handles(page, [v.vacancy_id for v in vacancies])
     for idx, v in enumerate(vacancies, start=1):
         w = v.watchers_count if v.watchers_count is not None else "—"
         print(f"\n[{idx}/{len(vacancies)}] Отклик на вакансию: {v.title}")
         print(f"    Сейчас ее просматривает: {w}")
 
-        card = find_card_by_vacancy_id(page, v.vacancy_id)
-        if card.count() == 0:
+        card = await resolve_card(page, card_handles, v.vacancy_id)
+        if card is None:
             print("    ⚠️ Карточка не найдена (выдача могла обновиться). Пропускаю.")
             continue
 
         # Генерируем сопроводительное письмо
-        cover_letter = generate_cover_letter(v.title, v.description, cover_letter_template)
+        cover_letter = cover_letter_template or generate_cover_letter(v.title)
 
-        status = click_apply_on_card(page, card, cover_letter_text=cover_letter)
+        status = await click_apply_on_card(page, card, cover_letter_text=cover_letter)
 
         if status == "sent":
             print("    ✅ Отклик отправлен.")
@@ -603,9 +948,9 @@ def run(playwright: Playwright,
             continue
 
         # Иначе — скрываем вакансию (чтобы не маячила)
-        card_again = find_card_by_vacancy_id(page, v.vacancy_id)
-        if card_again.count() > 0:
-            hidden = hide_vacancy_card(page, card_again)
+        card = await resolve_card(page, card_handles, v.vacancy_id)
+        if card is not None:
+            hidden = await hide_vacancy_card(page, card)
             print("    🫥 Вакансия скрыта." if hidden else "    ⚠️ Не удалось скрыть вакансию.")
         else:
             print("    ⚠️ Карточку для скрытия не нашёл.")
@@ -619,9 +964,10 @@ def run(playwright: Playwright,
         else:
             print(f"    ❓ Статус: {status} — пропуск.")
 
+    await dispose_card_handles(card_handles)
+
     print("\n✅ Работа завершена!")
-    context.close()
-    browser.close()
+    await release_browser_context(context, page, owns_context, cdp_browser)
 
 
 if __name__ == "__main__":
@@ -636,6 +982,9 @@ if __name__ == "__main__":
     parser.add_argument("--cover-letter", type=str, help="Шаблон сопроводительного письма (файл или текст)")
     parser.add_argument("--extract-texts", action="store_true", help="Извлекать тексты вакансий")
     parser.add_argument("--limit", type=int, default=10, help="Максимальное количество вакансий для отклика (по умолчанию: 10)")
+    parser.add_argument("--keep-alive", action="store_true",
+                       help="Только запустить браузер и держать его открытым; следующие запуски подключатся к нему")
+    parser.add_argument("--concurrency", type=int, default=5, help="Сколько вакансий обрабатывать параллельно при извлечении текстов (по умолчанию: 5)")
     
     args = parser.parse_args()
     
@@ -659,11 +1008,21 @@ if __name__ == "__main__":
             # Если файл не найден, используем как текст
             cover_letter_template = args.cover_letter
     
-    with sync_playwright() as p:
-        run(p, 
-            phone_number=args.phone,
-            sms_code=args.sms_code,
-            search_query=search_query,
-            cover_letter_template=cover_letter_template,
-            extract_vacancy_texts=args.extract_texts,
-            limit=args.limit)
\ No newline at end of file
+    async def main() -> None:
+        async with async_playwright() as p:
+            if args.keep_alive:
+                await keep_browser_alive(p)
+                return
+            await run(p,
+                      phone_number=args.phone,
+                      sms_code=args.sms_code,
+                      search_query=search_query,
+                      cover_letter_template=cover_letter_template,
+                      extract_vacancy_texts=args.extract_texts,
+                      limit=args.limit,
+                      max_concurrency=args.concurrency)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n⏹ Остановлено пользователем")
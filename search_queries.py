@@ -48,6 +48,15 @@ BACKEND_DEVELOPER_QUERIES = [
     '(Java OR "Java разработчик") AND (Spring OR Spring Boot) AND (PostgreSQL OR MySQL) NOT (стажер OR intern OR junior)',
 ]
 
+# Соответствие роль → запросы. Строятся один раз при импорте; запросы статичны и не должны изменяться.
+_ALL_QUERIES = {
+    "react_nextjs": REACT_NEXTJS_QUERIES,
+    "qa_lead": QA_LEAD_QUERIES,
+    "backend": BACKEND_DEVELOPER_QUERIES,
+}
+_DEFAULT_QUERIES = {role: queries[0] for role, queries in _ALL_QUERIES.items()}
+
+
 # Функция для получения запроса по умолчанию
 def get_default_query(role: str = "react_nextjs") -> str:
     """
@@ -59,12 +68,7 @@ def get_default_query(role: str = "react_nextjs") -> str:
     Returns:
         Поисковый запрос
     """
-    queries_map = {
-        "react_nextjs": REACT_NEXTJS_QUERIES[0],
-        "qa_lead": QA_LEAD_QUERIES[0],
-        "backend": BACKEND_DEVELOPER_QUERIES[0],
-    }
-    return queries_map.get(role, REACT_NEXTJS_QUERIES[0])
+    return _DEFAULT_QUERIES.get(role, REACT_NEXTJS_QUERIES[0])
 
 
 # Функция для получения всех запросов для роли
@@ -78,10 +82,5 @@ def get_all_queries(role: str = "react_nextjs") -> list[str]:
     Returns:
         Список поисковых запросов
     """
-    queries_map = {
-        "react_nextjs": REACT_NEXTJS_QUERIES,
-        "qa_lead": QA_LEAD_QUERIES,
-        "backend": BACKEND_DEVELOPER_QUERIES,
-    }
-    return queries_map.get(role, REACT_NEXTJS_QUERIES)
+    return _ALL_QUERIES.get(role, REACT_NEXTJS_QUERIES)
 